@@ -2,34 +2,112 @@
 Google Cloud Platform 認証モジュール
 
 Workload Identity を使用したGoogle Cloud認証を提供します。
+アクセストークンはディスクにキャッシュし、定期実行の起動毎に
+トークン取得のラウンドトリップが発生しないようにします。
 """
 
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Tuple, Optional
 from google.auth import default
 from google.auth.credentials import Credentials
+from google.auth.transport.requests import Request
+
+# 定期実行のプロセスを跨いでアクセストークンを持ち回るためのキャッシュ
+_TOKEN_CACHE_PATH = Path.home() / ".cache" / "formulatorpro" / "token.json"
+_TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+
+def _load_cached_token(scopes: list) -> Optional[Tuple[str, datetime]]:
+    """
+    キャッシュ済みアクセストークンを読み込む
+
+    Args:
+        scopes: 要求しているスコープのリスト。保存時のスコープと
+            一致しないキャッシュは使わない
+
+    Returns:
+        tuple: (token, expiry)。キャッシュが無い/期限切れ間近の場合は None
+    """
+    try:
+        data = json.loads(_TOKEN_CACHE_PATH.read_text())
+        expiry = datetime.fromisoformat(data["expiry"])
+        token = data["token"]
+        cached_scopes = data["scopes"]
+    except (OSError, ValueError, KeyError):
+        return None
+    # 別スコープで発行されたトークンを流用しない
+    if sorted(cached_scopes) != sorted(scopes):
+        return None
+    if expiry.tzinfo is None:
+        # 旧フォーマット（naive UTC）のキャッシュも読めるようにする
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) >= expiry - _TOKEN_EXPIRY_MARGIN:
+        return None
+    return token, expiry
+
+
+def _save_cached_token(credentials: Credentials, scopes: list) -> None:
+    """
+    アクセストークンをキャッシュに保存（失敗しても処理は継続）
+
+    Args:
+        credentials: 保存するトークンを保持する認証情報
+        scopes: トークンを発行したスコープのリスト
+    """
+    if not getattr(credentials, "token", None) or not getattr(credentials, "expiry", None):
+        return
+    try:
+        # google-auth の expiry は naive UTC なので、タイムゾーン付きに
+        # 明示変換してから保存する
+        expiry = credentials.expiry
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        _TOKEN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _TOKEN_CACHE_PATH.write_text(json.dumps({
+            "token": credentials.token,
+            "expiry": expiry.isoformat(),
+            "scopes": sorted(scopes),
+        }))
+        _TOKEN_CACHE_PATH.chmod(0o600)
+    except OSError:
+        pass
 
 
 def get_gcp_credentials(scopes: Optional[list] = None) -> Tuple[Credentials, str]:
     """
     Google Cloud Platform の認証情報を取得
-    
+
+    有効なキャッシュ済みトークンがあればそれを使用し、無ければ
+    この場でリフレッシュして次回実行用にキャッシュします。
+
     Args:
         scopes: 必要なスコープのリスト。Noneの場合はデフォルトスコープを使用
-    
+
     Returns:
         tuple: (credentials, project_id)
-        
+
     Raises:
         google.auth.exceptions.DefaultCredentialsError: 認証情報が見つからない場合
     """
     if scopes is None:
         scopes = [
             "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive.readonly", 
+            "https://www.googleapis.com/auth/drive.readonly",
             "https://www.googleapis.com/auth/drive.file",
         ]
-    
+
     credentials, project = default(scopes=scopes)
+    cached = _load_cached_token(scopes)
+    if cached is not None:
+        token, expiry = cached
+        credentials.token = token
+        # google-auth は naive UTC の expiry を期待するため戻す
+        credentials.expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        credentials.refresh(Request())
+        _save_cached_token(credentials, scopes)
     return credentials, project
 
 
@@ -9,6 +9,8 @@ import gspread
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from google.auth.credentials import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from .auth import get_gcp_credentials
 
@@ -28,6 +30,19 @@ class SheetsClient:
         
         self.gc = gspread.authorize(credentials)
         self.credentials = credentials
+
+        # Sheets API の 429/5xx はバックオフ付きで再試行し、ジョブ全体の
+        # 再実行（PDF再取得・再パース）に落ちないようにする。
+        # values.append 系は POST で、Retry の既定 allowed_methods には
+        # 含まれないため明示的に許可する
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+            respect_retry_after_header=True,
+        )
+        self.gc.http_client.session.mount("https://", HTTPAdapter(max_retries=retry))
     
     def open_spreadsheet(self, spreadsheet_id: str):
         """
@@ -60,24 +75,11 @@ class SheetsClient:
             spreadsheet = self.open_spreadsheet(spreadsheet_id)
             return spreadsheet.add_worksheet(title=sheet_title, rows=2000, cols=30)
     
-    def get_first_empty_row(self, worksheet) -> int:
-        """
-        最初の空行の行番号を取得
-        
-        Args:
-            worksheet: ワークシートオブジェクト
-            
-        Returns:
-            int: 最初の空行の行番号（1から開始）
-        """
-        values = worksheet.get_all_values()
-        return len(values) + 1
-    
-    def append_records(self, spreadsheet_id: str, sheet_title: str, 
+    def append_records(self, spreadsheet_id: str, sheet_title: str,
                       records: List[Dict], url: str = "") -> None:
         """
         レコードをスプレッドシートに追記
-        
+
         Args:
             spreadsheet_id: スプレッドシートのID
             sheet_title: シート名
@@ -87,54 +89,95 @@ class SheetsClient:
         if not records:
             print("[INFO] 追記対象なし。")
             return
-        
-        worksheet = self.get_or_create_worksheet(spreadsheet_id, sheet_title)
+
         today_str = datetime.now().strftime("%Y/%m/%d")
-        
-        # レコードを行データに変換
-        rows = [self._record_to_row(record, today_str, url) for record in records]
-        
-        # 追記位置を計算
-        start_row = self.get_first_empty_row(worksheet)
-        end_row = start_row + len(rows) - 1
-        
-        # データを追記
-        worksheet.update(f"A{start_row}:O{end_row}", rows, value_input_option="USER_ENTERED")
-        
-        print(f"[DONE] {len(rows)} 行を {sheet_title}!A{start_row}:O{end_row} に追記しました。")
+
+        # レコードを行データに変換（定数列は雛形で1回だけ組み立てる）
+        template = _mk_row_template(today_str, url)
+        rows = [self._record_to_row(record, template) for record in records]
+        self.batch_append([(spreadsheet_id, sheet_title, rows)])
+
+    def batch_append(self, plans: List[tuple]) -> None:
+        """
+        複数シート宛の追記をまとめて実行
+
+        同一 (スプレッドシート, シート) 宛の行を先に束ね、API呼び出しを
+        シート毎に1回の values.append に抑えます。追記位置はサーバー側で
+        決定されるため、シート全体の事前取得は不要です。
+
+        Args:
+            plans: (spreadsheet_id, sheet_title, rows) のリスト
+        """
+        grouped: Dict[tuple, List[List[Any]]] = {}
+        for spreadsheet_id, sheet_title, rows in plans:
+            grouped.setdefault((spreadsheet_id, sheet_title), []).extend(rows)
+
+        for (spreadsheet_id, sheet_title), rows in grouped.items():
+            if not rows:
+                continue
+            worksheet = self.get_or_create_worksheet(spreadsheet_id, sheet_title)
+            worksheet.append_rows(
+                rows,
+                value_input_option="USER_ENTERED",
+                insert_data_option="INSERT_ROWS",
+                table_range="A1:O1",
+            )
+            print(f"[DONE] {len(rows)} 行を {sheet_title} に追記しました。")
     
-    def _record_to_row(self, record: Dict, today_str: str, url: str = "") -> List[Any]:
+    def _record_to_row(self, record: Dict, template: List[Any]) -> List[Any]:
         """
         レコード辞書をスプレッドシート行データに変換
-        
+
         Args:
             record: レコード辞書
-            today_str: 今日の日付文字列
-            url: PDF URL
-            
+            template: _mk_row_template で作成した A..O 行の雛形
+
         Returns:
             List: 行データ（A列からO列まで）
         """
-        seibun = record.get("seibunn") or record.get("seibun") or ""
-        final_url = record.get("url", "") or url
-        
-        return [
-            0,                           # A: 変更フラグ
-            today_str,                   # B: 今日の日付
-            0,                           # C: グループID
-            seibun,                      # D: 成分名
-            "",                          # E: 規制区分（空欄）
-            record.get("ryou1", ""),     # F: 配合上限値（一般）
-            record.get("条件", ""),      # G: 使用対象・条件（一般）
-            record.get("ryou2", ""),     # H:非粘膜・洗い流す上限値
-            record.get("ryou3", ""),     # I:非粘膜・洗い流さない上限値
-            record.get("ryou4", ""),     # J:粘膜用上限値
-            record.get("tanni", ""),     # K:単位
-            record.get("bikou", ""),     # L: 備考
-            "",                          # M: 予備
-            "",                          # N: 予備
-            final_url,                   # O: PDF URL
-        ]
+        row = list(template)
+        row[3] = record.get("seibunn") or record.get("seibun") or ""   # D: 成分名
+        row[5] = record.get("ryou1", "")    # F: 配合上限値（一般）
+        row[6] = record.get("条件", "")     # G: 使用対象・条件（一般）
+        row[7] = record.get("ryou2", "")    # H: 非粘膜・洗い流す上限値
+        row[8] = record.get("ryou3", "")    # I: 非粘膜・洗い流さない上限値
+        row[9] = record.get("ryou4", "")    # J: 粘膜用上限値
+        row[10] = record.get("tanni", "")   # K: 単位
+        row[11] = record.get("bikou", "")   # L: 備考
+        final_url = record.get("url", "")
+        if final_url:
+            row[14] = final_url             # O: PDF URL
+        return row
+
+
+def _mk_row_template(today_str: str, url: str = "") -> List[Any]:
+    """
+    A..O 行の雛形を作成（変更フラグ・日付・グループID・URL 以外は空文字）
+
+    Args:
+        today_str: 今日の日付文字列
+        url: PDF URL（レコード側に url が無い場合の既定値）
+
+    Returns:
+        List: 行データの雛形（A列からO列まで）
+    """
+    return [
+        0,          # A: 変更フラグ
+        today_str,  # B: 今日の日付
+        0,          # C: グループID
+        "",         # D: 成分名
+        "",         # E: 規制区分（空欄）
+        "",         # F: 配合上限値（一般）
+        "",         # G: 使用対象・条件（一般）
+        "",         # H: 非粘膜・洗い流す上限値
+        "",         # I: 非粘膜・洗い流さない上限値
+        "",         # J: 粘膜用上限値
+        "",         # K: 単位
+        "",         # L: 備考
+        "",         # M: 予備
+        "",         # N: 予備
+        url,        # O: PDF URL
+    ]
 
 
 # 従来のインターフェースとの互換性を保つための関数
@@ -185,12 +228,14 @@ def append_records_to_sheet(ws_or_client, records: List[Dict],
         
         today_str = datetime.now().strftime("%Y/%m/%d")
         client = SheetsClient()
-        rows = [client._record_to_row(r, today_str) for r in records]
-        
-        # 最初の空行を取得
-        values = ws_or_client.get_all_values()
-        start = len(values) + 1
-        end = start + len(rows) - 1
-        
-        ws_or_client.update(f"A{start}:O{end}", rows, value_input_option="USER_ENTERED")
-        print(f"[DONE] {len(rows)} 行を {ws_or_client.title}!A{start}:O{end} に追記しました。")
\ No newline at end of file
+        template = _mk_row_template(today_str)
+        rows = [client._record_to_row(r, template) for r in records]
+
+        # サーバー側で最初の空行を判定して追記（values.append）
+        ws_or_client.append_rows(
+            rows,
+            value_input_option="USER_ENTERED",
+            insert_data_option="INSERT_ROWS",
+            table_range="A1:O1",
+        )
+        print(f"[DONE] {len(rows)} 行を {ws_or_client.title} に追記しました。")
\ No newline at end of file
@@ -3,9 +3,15 @@
 from typing import List, Dict
 from urllib.parse import urljoin
 from datetime import datetime
+import asyncio
+import functools
 import re
-import requests
-from bs4 import BeautifulSoup, Tag
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+from record_filters import is_meaningful
 
 # === ハードコーディング（必要に応じて変更）========================
 URL = "https://www.mhlw.go.jp/web/t_doc?dataId=81aa1263&dataType=0"
@@ -16,74 +22,122 @@ SPREADSHEET_ID = "1iHKZn9y-AZkeO9TUf0kN3_3GBIthwtTr4i19tNStg8U"  # 例: 1abcdEFG
 SHEET_TITLE = "更新情報一覧"  # 追記先シート名
 # ===============================================================
 
+# HTTP GET は SQLite キャッシュ付きセッション経由（ETag/URL キーで再取得を回避、
+# 取得失敗時は期限切れキャッシュで継続）。セッションを使い回すことで
+# TLS ハンドシェイクを接続毎に払い直さない（keep-alive + gzip）
+SESSION = requests_cache.CachedSession(
+    "mhlw_cache", expire_after=3600, stale_if_error=True
+)
+SESSION.headers.update({
+    "Accept-Encoding": "gzip",
+    "User-Agent": "FormulatorPro-PeriodicExecution/0.1",
+})
+# 一時的な 429/5xx はジッタ付きバックオフで粘り、ジョブ全体の再実行を避ける
+_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    respect_retry_after_header=True,
+)
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=_RETRY)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
 
 # ---------------- 取得 ----------------
+def _fix_encoding(r) -> None:
+    # apparent_encoding は本文全体を chardet でスキャンするので避けたいが、
+    # requests は charset 宣言の無い text/* を ISO-8859-1 とみなすため
+    # r.encoding は None にならない。ヘッダに charset が明示されている場合
+    # のみそれを信じ、無ければ UTF-8 を採用する
+    if "charset" not in r.headers.get("Content-Type", "").lower():
+        r.encoding = "utf-8"
+
+
 def fetch_html(url: str, iframe_first: bool = False) -> str:
-    r = requests.get(url, timeout=30)
+    r = SESSION.get(url, timeout=30)
     r.raise_for_status()
-    r.encoding = r.apparent_encoding
+    _fix_encoding(r)
     outer_html = r.text
     if not iframe_first:
         return outer_html
 
-    soup = BeautifulSoup(outer_html, "lxml")
-    iframe = soup.find("iframe", src=True)
+    iframe = LexborHTMLParser(outer_html).css_first("iframe[src]")
     if not iframe:
         return outer_html
 
-    inner_url = urljoin(url, iframe["src"])
-    r2 = requests.get(inner_url, timeout=30)
+    inner_url = urljoin(url, iframe.attributes["src"])
+    r2 = SESSION.get(inner_url, timeout=30)
     r2.raise_for_status()
-    r2.encoding = r2.apparent_encoding
+    _fix_encoding(r2)
     return r2.text
 
 
-def pick_contents_node(html: str) -> Tag | None:
-    soup = BeautifulSoup(html, "lxml")
+async def afetch_html(url: str, iframe_first: bool = False) -> str:
+    """fetch_html の async 版。キャッシュ付き SESSION をワーカースレッドで使う。"""
+    return await asyncio.to_thread(fetch_html, url, iframe_first)
+
+
+def fetch_html_many(urls: List[str], iframe_first: bool = False) -> List[str]:
+    """複数 URL を並列取得（I/Oバウンドなので待ち時間は max(latency) になる）。"""
+
+    async def _gather():
+        return await asyncio.gather(*(afetch_html(u, iframe_first) for u in urls))
+
+    return list(asyncio.run(_gather()))
+
+
+def pick_contents_node(html: str) -> LexborNode | None:
+    tree = LexborHTMLParser(html)
     for sel in (
         "html > body.body > div.wrapper > div.main > div#contents",
         "html > body.body > div.wrapper > div.main > div.contents",  # 保険
         "#contents",
         ".contents",
     ):
-        node = soup.select_one(sel)
+        node = tree.css_first(sel)
         if node:
             return node
     return None
 
 
 # -------------- 探索（table→行→セル） --------------
-def collect_bon_tables(contents: Tag) -> List[Tag]:
-    tables: List[Tag] = []
-    candidates = contents.select(":scope > div[id]") or contents.select("div[id]")
+def collect_bon_tables(contents: LexborNode) -> List[LexborNode]:
+    tables: List[LexborNode] = []
+    candidates = [
+        n for n in contents.iter() if n.tag == "div" and "id" in n.attributes
+    ] or contents.css("div[id]")
     for block in candidates:
-        for fr in block.select("div.table_frame"):
-            wrappers = fr.select(
+        for fr in block.css("div.table_frame"):
+            wrappers = fr.css(
                 "div.table_wrpper, div.table_wrapper, div.table-wrapper"
             )
             if wrappers:
                 for wp in wrappers:
-                    tables.extend(wp.select("table.b-on"))
+                    tables.extend(wp.css("table.b-on"))
             else:
-                tables.extend(fr.select("table.b-on"))
+                tables.extend(fr.css("table.b-on"))
     return tables
 
 
-def classless_trs_of_table(tbl: Tag) -> List[Tag]:
-    tbody = tbl.find("tbody") or tbl
-    rows: List[Tag] = []
-    for tr in tbody.find_all("tr", recursive=False):
-        if not tr.get("class"):
-            rows.append(tr)
-    return rows
+def classless_trs_of_table(tbl: LexborNode) -> List[LexborNode]:
+    tbody = tbl.css_first("tbody") or tbl
+    # class の有無判定は lexbor の CSS エンジンに寄せる（:scope は未対応のため、
+    # 入れ子表の tr は parent 比較で除外して「直下のみ」を保つ）
+    return [
+        tr for tr in tbody.css("tr:not([class])")
+        if tr.parent.mem_id == tbody.mem_id
+    ]
 
 
-def td_p_texts(tr: Tag) -> List[str]:
+def td_p_texts(tr: LexborNode) -> List[str]:
     cells: List[str] = []
-    for td in tr.find_all("td", recursive=False):
+    for td in tr.iter():
+        if td.tag != "td":
+            continue
         texts = [
-            " ".join(p.stripped_strings).replace("\u3000", " ").strip()
-            for p in td.find_all("p")
+            p.text(deep=True, separator=" ", strip=True).replace("\u3000", " ").strip()
+            for p in td.css("p")
         ]
         texts = [t for t in texts if t]
         cells.append(" ".join(texts))
@@ -98,9 +152,14 @@ EXPECTED_HEADER = [
 ]
 
 
+_RE_WS = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=8192)
 def _norm(s: str) -> str:
+    # 同じセル値が行を跨いで繰り返し正規化されるためキャッシュする
     s = (s or "").replace("\u3000", " ")
-    return re.sub(r"\s+", " ", s).strip()
+    return _RE_WS.sub(" ", s).strip()
 
 
 def is_header_row(cells: List[str]) -> bool:
@@ -127,11 +186,11 @@ def build_tables_rows(url: str, iframe_first: bool = False) -> List[List[List[st
 
 # -------------- 行 → JSON(dict) --------------
 NUM_RE = re.compile(r"^\d+(?:\.\d+)?$")
+GRAM_RE = re.compile(r"[gｇ]")
 
 
-def strip_units_and_note(val: str) -> tuple[str, str, str]:
-    """値から 合計量として / 国際単位 / g(ｇ) を除去 → (clean, unit, note)"""
-    s = _norm(val or "")
+def strip_units_and_note(s: str) -> tuple[str, str, str]:
+    """正規化済みの値から 合計量として / 国際単位 / g(ｇ) を除去 → (clean, unit, note)"""
     note = ""
     if "合計量として" in s:
         s = s.replace("合計量として", "").strip()
@@ -140,143 +199,108 @@ def strip_units_and_note(val: str) -> tuple[str, str, str]:
     if "国際単位" in s:
         unit = "国際単位"
         s = s.replace("国際単位", "")
-    if re.search(r"[gｇ]", s):
+    if GRAM_RE.search(s):
         if not unit:
             unit = "g"
-        s = re.sub(r"[gｇ]", "", s)
+        s = GRAM_RE.sub("", s)
     s = _norm(s)
     if NUM_RE.fullmatch(s) and not unit:
         unit = "g"
     return s, unit, note
 
 
-def strip_units_and_note_value_only(val: str) -> str:
-    s = _norm(val or "")
+def strip_units_and_note_value_only(s: str) -> str:
+    """正規化済みの値から 合計量として / 国際単位 / g(ｇ) を除去"""
     s = s.replace("合計量として", "").replace("国際単位", "")
-    s = re.sub(r"[gｇ]", "", s)
+    s = GRAM_RE.sub("", s)
     return _norm(s)
 
 
-def has_meaningful_values(rec: dict) -> bool:
-    """
-    成分名以外の有効値（最大配合量1〜4, 単位, 備考）のどれか1つでも入っているか。
-    これが False のときは書き込まない。
-    """
-    return any(
-        (rec.get(k) or "").strip()
-        for k in [
-            "最大配合量1",
-            "最大配合量2",
-            "最大配合量3",
-            "最大配合量4",
-            "単位",
-            "備考",
-        ]
-    )
-
-
 def row_to_record(row: List[str]) -> Dict[str, str]:
-    rec = {
-        "成分名": "",
-        "最大配合量1": "",
+    # 正規化は1回だけ行い、分岐毎に dict リテラル1個でレコードを組み立てる
+    norm_row = [_norm(c) for c in row]
+    name = norm_row[0] if norm_row else ""
+
+    if len(norm_row) >= 2:
+        clean, unit, note = strip_units_and_note(norm_row[1])
+    else:
+        clean = unit = note = ""
+
+    if len(norm_row) == 4:
+        return {
+            "成分名": name,
+            "最大配合量1": "",
+            "最大配合量2": clean,
+            "最大配合量3": strip_units_and_note_value_only(norm_row[2]),
+            "最大配合量4": strip_units_and_note_value_only(norm_row[3]),
+            "単位": unit,
+            "備考": note,
+        }
+
+    # 0〜1要素は空レコード、2要素とその他は最大配合量1 扱い
+    return {
+        "成分名": name,
+        "最大配合量1": clean,
         "最大配合量2": "",
         "最大配合量3": "",
         "最大配合量4": "",
-        "単位": "",
-        "備考": "",
+        "単位": unit,
+        "備考": note,
     }
-    if not row:
-        return rec
-    rec["成分名"] = _norm(row[0])
-
-    if len(row) == 1:
-        return rec
-
-    if len(row) == 2:
-        clean, unit, note = strip_units_and_note(row[1])
-        rec["最大配合量1"] = clean
-        rec["単位"] = unit
-        rec["備考"] = note
-        return rec
-
-    if len(row) == 4:
-        clean2, unit, note = strip_units_and_note(row[1])
-        rec["最大配合量2"] = clean2
-        rec["単位"] = unit
-        rec["備考"] = note
-        rec["最大配合量3"] = strip_units_and_note_value_only(row[2])
-        rec["最大配合量4"] = strip_units_and_note_value_only(row[3])
-        return rec
-
-    # その他は 2要素扱いでフォールバック
-    clean, unit, note = strip_units_and_note(row[1])
-    rec["最大配合量1"] = clean
-    rec["単位"] = unit
-    rec["備考"] = note
-    return rec
 
 
 # -------------- Google Sheets --------------
-def connect_gspread():
-    import gspread
+from gcp import SheetsClient
+
+
+def connect_sheets_client() -> SheetsClient:
+    """サービスアカウント認証で共有の SheetsClient を作る"""
+    from google.oauth2.service_account import Credentials
 
     scopes = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive.file",
         "https://www.googleapis.com/auth/drive.readonly",
     ]
-    return gspread.service_account(filename=SERVICE_ACCOUNT_JSON, scopes=scopes)
-
+    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_JSON, scopes=scopes)
+    return SheetsClient(credentials=creds)
 
-def open_or_create_worksheet(gc, spreadsheet_id: str, title: str):
-    sh = gc.open_by_key(spreadsheet_id)
-    try:
-        return sh.worksheet(title)
-    except Exception:
-        return sh.add_worksheet(title=title, rows=2000, cols=30)
 
-
-def first_empty_row(ws) -> int:
-    # ヘッダーがある前提で、既存最終行の次の行を返す
-    values = ws.get_all_values()
-    return len(values) + 1
-
-
-def record_to_row_for_sheet(rec: Dict[str, str], date_str: str, url: str) -> List:
+def _mk_row_template(date_str: str, url: str) -> List:
     """
-    A..O の並びで返す（未指定列は空文字）
-      B: 今日, C:0, D:成分名, F:最大配合量1, H:最大配合量2, I:最大配合量3,
-      J:最大配合量4, K:単位, L:備考, O:URL
+    A..O 行の雛形（未指定列は空文字）
+      A: 変更フラグ（任意で0）, B: 今日, C: グループID,
+      M/N: 予備, O: ソースURL（HTML）
     """
-    return [
-        0,  # A 変更フラグ（任意で0）
-        date_str,  # B 今日
-        0,  # C グループID
-        rec.get("成分名", ""),  # D
-        "",  # E 規制区分（空）
-        rec.get("最大配合量1", ""),  # F
-        "",  # G 使用対象・条件（空）
-        rec.get("最大配合量2", ""),  # H
-        rec.get("最大配合量3", ""),  # I
-        rec.get("最大配合量4", ""),  # J
-        rec.get("単位", ""),  # K
-        rec.get("備考", ""),  # L
-        "",  # M 予備
-        "",  # N 予備
-        url,  # O ソースURL（HTML）
-    ]
+    return [0, date_str, 0, "", "", "", "", "", "", "", "", "", "", "", url]
 
 
-def append_records_to_sheet(ws, records: List[Dict[str, str]], url: str):
+def record_to_row_for_sheet(rec: Dict[str, str], template: List) -> List:
+    """
+    雛形を複製して A..O の並びで返す
+      D:成分名, F:最大配合量1, H:最大配合量2, I:最大配合量3,
+      J:最大配合量4, K:単位, L:備考
+    """
+    row = list(template)
+    row[3] = rec.get("成分名", "")  # D
+    row[5] = rec.get("最大配合量1", "")  # F
+    row[7] = rec.get("最大配合量2", "")  # H
+    row[8] = rec.get("最大配合量3", "")  # I
+    row[9] = rec.get("最大配合量4", "")  # J
+    row[10] = rec.get("単位", "")  # K
+    row[11] = rec.get("備考", "")  # L
+    return row
+
+
+def append_records_to_sheet(client: SheetsClient, records: List[Dict[str, str]], url: str):
     if not records:
         print("[INFO] 追記対象なし。")
         return
     today_str = datetime.now().strftime("%Y/%m/%d")
-    rows = [record_to_row_for_sheet(r, today_str, url) for r in records]
-    start = first_empty_row(ws)
-    end = start + len(rows) - 1
-    ws.update(f"A{start}:O{end}", rows, value_input_option="USER_ENTERED")
-    print(f"[DONE] {len(rows)} 行を {ws.title}!A{start}:O{end} に追記しました。")
+    template = _mk_row_template(today_str, url)
+    rows = [record_to_row_for_sheet(r, template) for r in records]
+    # シート宛の書き込みを1回の追記にまとめる
+    client.batch_append([(SPREADSHEET_ID, SHEET_TITLE, rows)])
 
 
 # -------------- メイン --------------
@@ -289,7 +313,10 @@ def main():
     for table in tables_rows:
         for row in table:
             rec = row_to_record(row)
-            if rec["成分名"] and has_meaningful_values(rec):  # ← ここでフィルタ
+            # 書き込み対象の判定ルールは record_filters に集約
+            if is_meaningful(rec["成分名"], rec["最大配合量1"], rec["最大配合量2"],
+                             rec["最大配合量3"], rec["最大配合量4"],
+                             rec["単位"], rec["備考"]):
                 records.append(rec)
 
     print(f"[INFO] JSONレコード数(書き込み対象): {len(records)}")
@@ -298,9 +325,8 @@ def main():
         print(f"{i:03d}: {r}")
 
     # 3) スプレッドシートへ追記
-    gc = connect_gspread()
-    ws = open_or_create_worksheet(gc, SPREADSHEET_ID, SHEET_TITLE)
-    append_records_to_sheet(ws, records, URL)
+    client = connect_sheets_client()
+    append_records_to_sheet(client, records, URL)
 
 
 if __name__ == "__main__":
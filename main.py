@@ -1,8 +1,15 @@
-import io, sys, re, os, json, argparse
+import sys, re, os, json, argparse, tempfile
+import functools
+import hashlib
+import pickle
+import concurrent.futures
+import itertools
 from typing import List, Dict, Set
 from datetime import datetime
 import pandas as pd
 
+from record_filters import is_meaningful
+
 # ========= 既定値（引数で上書き可） =========
 PDF_URL_DEFAULT = "https://www.mhlw.go.jp/content/000491511.pdf"
 PAGES_DEFAULT = "all"             # "all" / "2-12" / "2,4,9" など
@@ -19,9 +26,12 @@ SAVE_JSON_ALL = False             # True にすれば ALL JSON も保存
 JSON_DIR = "./json_out"
 JSON_ALL_FILENAME = "ccc_ALL.json"
 
-# Camelot（latticeのみ）
-LATTICE_LINE_SCALE = 40
-LATTICE_COPY_TEXT  = ['h', 'v']
+# 解析結果キャッシュ（PDF内容の SHA-256 をキーに items を保存）
+CACHE_DIR = "./cache"
+LAST_DIGEST_FILENAME = "last_appended.txt"  # 前回追記した PDF のダイジェスト
+
+# pdfplumber（罫線で区切られた表のみ抽出）
+TABLE_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
 TEXT_STRIP = "\n"
 
 # ========= 引数 =========
@@ -33,16 +43,20 @@ def parse_args():
 
 # ========= 共通 =========
 def download_pdf_bytes(url: str) -> bytes:
-    import urllib.request
-    with urllib.request.urlopen(url) as r:
-        return r.read()
+    # html_to_table と同じセッションを使い、接続プール/キャッシュを共有する
+    from html_to_table import SESSION
+    r = SESSION.get(url, timeout=60)
+    r.raise_for_status()
+    return r.content
 
-def to_pages_arg(pdf_bytes: bytes, pages_value: str) -> str:
+def to_pages_arg(pdf_path: str, pages_value: str) -> str:
     """--pages 指定 or 既定値を採用。USE_AUTO_PAGE_RANGE=True の場合は 2-最終 などに自動化。"""
     if not USE_AUTO_PAGE_RANGE:
         return pages_value
-    from pypdf import PdfReader
-    last = len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+    # ページ数の取得も抽出と同じ pdfplumber に寄せる（pypdf は依存から外れた）
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        last = len(pdf.pages)
     start = min(max(1, int(AUTO_START_PAGE)), last)
     return f"{start}-{last}"
 
@@ -50,72 +64,88 @@ def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 # ========= クリーニング =========
+# セル毎の Python 関数呼び出しを避けるため、パターンはモジュールスコープで
+# 事前コンパイルし、列単位の .str.replace チェーンで一括置換する
+_RE_PAREN       = re.compile(r"（([^）]*)）")
+_RE_PAREN_WS    = re.compile(r"[ \t\u3000]+")
+_RE_GOKEI_SP    = re.compile(r"(合計量として)\s+")
+_RE_KOKUSAI_SP  = re.compile(r"\s+(?=国際単位)")
+_RE_2ETHYL      = re.compile(r"(^|[^,])\s2－エチル")
+_RE_HWS         = re.compile(r"[ \t]+")
+
+def _rm_spaces_inside_paren(m: re.Match) -> str:
+    # 全角括弧の内部スペース削除: "（８ ～ 10 E.O. ）" → "（８～10E.O.）"
+    return f"（{_RE_PAREN_WS.sub('', m.group(1))}）"
+
 def clean_df(df: pd.DataFrame) -> pd.DataFrame:
-    def _strip_cell(x):
-        if isinstance(x, str):
-            y = x.replace("\u3000", " ")  # 全角→半角スペース
-
-            # 全角括弧の内部スペース削除: "（８ ～ 10 E.O. ）" → "（８～10E.O.）"
-            def _rm_spaces_inside_paren(m):
-                inner = re.sub(r"[ \t\u3000]+", "", m.group(1))
-                return f"（{inner}）"
-            y = re.sub(r"（([^）]*)）", _rm_spaces_inside_paren, y)
-
-            # 固定置換
-            y = re.sub(r"(合計量として)\s+", r"\1", y)  # 「合計量として」の直後スペース削除
-            y = re.sub(r"\s+(?=国際単位)", "", y)        # 「国際単位」の直前スペース削除
-            # 「 2－エチル」→「,2－エチル」（直前がカンマでない半角スペースを対象）
-            y = re.sub(r"(^|[^,])\s2－エチル", r"\1,2－エチル", y)
-
-            # 余分な空白の正規化
-            y = re.sub(r"[ \t]+", " ", y).strip()
-            return y
-        return x
-    return df.map(_strip_cell)
+    out = df.copy()
+    for c in out.columns:
+        s = out[c].astype("string")
+        s = s.str.replace("\u3000", " ", regex=False)  # 全角→半角スペース
+        s = s.str.replace(_RE_PAREN, _rm_spaces_inside_paren, regex=True)
+        s = s.str.replace(_RE_GOKEI_SP, r"\1", regex=True)  # 「合計量として」の直後スペース削除
+        s = s.str.replace(_RE_KOKUSAI_SP, "", regex=True)   # 「国際単位」の直前スペース削除
+        # 「 2－エチル」→「,2－エチル」（直前がカンマでない半角スペースを対象）
+        s = s.str.replace(_RE_2ETHYL, r"\1,2－エチル", regex=True)
+        # 余分な空白の正規化
+        s = s.str.replace(_RE_HWS, " ", regex=True).str.strip()
+        out[c] = s.astype(object)
+    return out
 
 # ========= 行フィルタ =========
 DIGIT_ROW_MIN_RATIO = 0.8  # 非空セルのうち「数字だけ」の割合がこの値以上なら削除
 
-def _is_int_string(s: str) -> bool:
-    return bool(re.fullmatch(r"\d+", s))
-
-def _norm_no_space(s: str) -> str:
-    return re.sub(r"\s+", "", str(s).replace("\u3000", " ")).strip()
+_RE_INT = re.compile(r"\d+")
+_RE_WS  = re.compile(r"\s+")
 
 def drop_unwanted_rows(df: pd.DataFrame) -> pd.DataFrame:
     """数字だけ行/「成分名」行を削除"""
     if df is None or df.empty:
         return df
-    keep_idx = []
-    for i, row in df.iterrows():
-        cells = [str(v).strip() for v in row.tolist()]
-        nonempty = [c for c in cells if c and c.lower() != "nan"]
-        digit_only_cnt = sum(1 for c in nonempty if _is_int_string(c))
-        is_digit_row = (len(nonempty) > 0) and (digit_only_cnt / len(nonempty) >= DIGIT_ROW_MIN_RATIO)
-        first_norm = _norm_no_space(row.iloc[0]) if len(row) > 0 else ""
-        is_seibunmei = (first_norm == "成分名")
-        if not (is_digit_row or is_seibunmei):
-            keep_idx.append(i)
-    return df.loc[keep_idx].reset_index(drop=True)
+    # iterrows() は行毎に Series を生成して遅いので、ブールマスクで一括判定する
+    s = df.astype(str).apply(lambda c: c.str.strip())
+    nonempty = (s != "") & (s.apply(lambda c: c.str.lower()) != "nan")
+    digits = s.apply(lambda c: c.str.fullmatch(_RE_INT))
+    nonempty_cnt = nonempty.sum(axis=1)
+    digit_cnt = (digits & nonempty).sum(axis=1)
+    is_digit_row = (nonempty_cnt > 0) & (
+        digit_cnt / nonempty_cnt.clip(lower=1) >= DIGIT_ROW_MIN_RATIO
+    )
+    first_norm = (
+        s.iloc[:, 0].str.replace("\u3000", " ", regex=False)
+        .str.replace(_RE_WS, "", regex=True)
+    )
+    mask = ~(is_digit_row | (first_norm == "成分名"))
+    return df.loc[mask].reset_index(drop=True)
 
 # ========= トークン移動（左列→右列(位置-1)） =========
 _TOKEN_IS_AMOUNT = re.compile(r"^\d+(?:\.\d+)?(?:ｇ|国際単位)$")
 
-def _split_tokens(s: str) -> list[str]:
+@functools.lru_cache(maxsize=8192)
+def _split_tokens_cached(s: str) -> tuple[str, ...]:
+    return tuple(t for t in _RE_WS.split(s.strip()) if t)
+
+def _split_tokens(s) -> tuple[str, ...]:
+    # 同じセル値（空文字や「配合負荷」等）が繰り返し現れるため分割結果をキャッシュ。
+    # 呼び出し間で共有できるようイミュータブルな tuple を返す
     if s is None or (isinstance(s, float) and pd.isna(s)):
-        return []
-    return [t for t in re.split(r"\s+", str(s).strip()) if t]
+        return ()
+    return _split_tokens_cached(str(s))
 
 def _join_tokens(tokens: list[str]) -> str:
     return " ".join([t for t in tokens if t != ""])
 
 def move_amount_token_from_col1_to_col2(df: pd.DataFrame) -> pd.DataFrame:
+    """df を直接書き換えて返す（呼び出し側は戻り値に付け替える前提）"""
     if df is None or df.empty or df.shape[1] < 2:
         return df
-    out = df.copy()
-    for r in range(len(out)):
-        c1 = _split_tokens(out.iat[r, 0])
-        c2 = _split_tokens(out.iat[r, 1])
+    # .iat の行毎 get/set はセル毎にインデクサを通すため、列を list に
+    # 抜き出してから処理し、最後に列ごと書き戻す
+    col1 = df.iloc[:, 0].tolist()
+    col2 = df.iloc[:, 1].tolist()
+    for r in range(len(col1)):
+        c1 = list(_split_tokens(col1[r]))
+        c2 = list(_split_tokens(col2[r]))
         hits = [i for i, tok in enumerate(c1) if _TOKEN_IS_AMOUNT.match(tok)]
         for i_hit in sorted(hits, reverse=True):
             insert_pos = i_hit - 1
@@ -125,34 +155,95 @@ def move_amount_token_from_col1_to_col2(df: pd.DataFrame) -> pd.DataFrame:
             if insert_pos > len(c2):
                 c2.extend([""] * (insert_pos - len(c2)))
             c2.insert(insert_pos, moved)
-        out.iat[r, 0] = _join_tokens(c1)
-        out.iat[r, 1] = _join_tokens(c2)
+        col1[r] = _join_tokens(c1)
+        col2[r] = _join_tokens(c2)
+    df.iloc[:, 0] = col1
+    df.iloc[:, 1] = col2
+    return df
+
+# ========= テーブル抽出（罫線ベースのみ） =========
+def _parse_pages_arg(pages: str, last: int) -> Set[int]:
+    """"all" / "2-10" / "2,4,9" 形式のページ指定を集合に展開する"""
+    if not pages or pages == "all":
+        return set(range(1, last + 1))
+    out: Set[int] = set()
+    for part in pages.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            out.update(range(int(a), (last if b in ("", "end") else int(b)) + 1))
+        else:
+            out.add(int(part))
     return out
 
-# ========= テーブル抽出（latticeのみ） =========
-def extract_tables_lattice_only(pdf_bytes: bytes, pages: str = "all"):
-    import camelot
+def _fill_spanning_cells(table, data: list) -> list:
+    """camelot の copy_text=['h','v'] 相当の結合セル補完。
+
+    pdfplumber は結合セルの被覆側グリッド位置を None で返す。スパン元セルの
+    bbox は被覆範囲まで伸びているため、直近の実セルが行/列の境界を越えて
+    いればそのテキストを被覆位置へ複製する（複数行に跨る成分名セル対策）。
+    """
+    rows = table.rows
+    # 実セルが存在する位置から各列の開始x / 各行の開始yを拾う
+    col_x0: Dict[int, float] = {}
+    row_top: Dict[int, float] = {}
+    for i, r in enumerate(rows):
+        for j, c in enumerate(r.cells):
+            if c is None:
+                continue
+            col_x0.setdefault(j, c[0])
+            row_top.setdefault(i, c[1])
+    eps = 1.0
+    for direction in ("h", "v"):
+        for i, row in enumerate(data):
+            for j, val in enumerate(row):
+                if val is not None or rows[i].cells[j] is not None:
+                    continue
+                if direction == "h":
+                    # 左方向の直近の実セルが列境界を越えていればスパン元
+                    for k in range(j - 1, -1, -1):
+                        c = rows[i].cells[k]
+                        if c is not None:
+                            if j in col_x0 and c[2] > col_x0[j] + eps:
+                                data[i][j] = data[i][k]
+                            break
+                else:
+                    # 上方向の直近の実セルが行境界を越えていればスパン元
+                    for k in range(i - 1, -1, -1):
+                        c = rows[k].cells[j]
+                        if c is not None:
+                            if i in row_top and c[3] > row_top[i] + eps:
+                                data[i][j] = data[k][j]
+                            break
+    return data
+
+def extract_tables_lattice_only(pdf_path: str, pages: str = "all"):
+    # pdfplumber はテキスト/罫線ツリーを直接歩くため、Ghostscript での
+    # ラスタライズ + OpenCV の線検出を行う camelot-lattice より軽い
+    import pdfplumber
     items: List[Dict] = []
-    kwargs = dict(
-        flavor="lattice",
-        pages=pages,
-        strip_text=TEXT_STRIP,
-        line_scale=LATTICE_LINE_SCALE,
-        copy_text=LATTICE_COPY_TEXT,
-    )
     try:
-        tables = camelot.read_pdf(io.BytesIO(pdf_bytes), **kwargs)
-        for order, t in enumerate(tables):
-            p = int(t.page)
-            if p in EXCLUDE_PAGES:
-                continue
-            cdf = clean_df(t.df)
-            if cdf is None or cdf.empty or cdf.shape[0] < 2 or cdf.shape[1] < 2:
-                continue
-            items.append({"page": p, "order": order, "df": cdf})
+        with pdfplumber.open(pdf_path) as pdf:
+            targets = _parse_pages_arg(pages, len(pdf.pages))
+            for p, pg in enumerate(pdf.pages, start=1):
+                if p not in targets or p in EXCLUDE_PAGES:
+                    continue
+                for order, tbl in enumerate(pg.find_tables(table_settings=TABLE_SETTINGS)):
+                    data = _fill_spanning_cells(tbl, tbl.extract())
+                    # 補完後も残る None（欠損セル）は camelot 同様 "" に寄せ、
+                    # pd.NA → "<NA>" が下流の文字列処理へ漏れないようにする
+                    df = pd.DataFrame(data).fillna("")
+                    for c in df.columns:
+                        df[c] = df[c].str.replace(TEXT_STRIP, "", regex=False)
+                    cdf = clean_df(df)
+                    if cdf is None or cdf.empty or cdf.shape[0] < 2 or cdf.shape[1] < 2:
+                        continue
+                    items.append({"page": p, "order": order, "df": cdf})
     except Exception as e:
-        print("[ERROR] lattice 解析で例外:", e, file=sys.stderr)
-    items.sort(key=lambda x: (x["page"], x["order"]))
+        print("[ERROR] 表抽出で例外:", e, file=sys.stderr)
+    # ページ昇順に走査しているため items は既に (page, order) 順
     return items
 
 # ========= JSON化前の追加前処理 =========
@@ -161,16 +252,19 @@ def squash_left_when_many_tokens_and_right_one(df: pd.DataFrame) -> pd.DataFrame
     各行をスペースで分割したとき、
       左列トークン数>=3 かつ 右列トークン数==1 の場合、
       左列を「スペース全削除」して1トークン化する。
+    df を直接書き換えて返す（呼び出し側は戻り値に付け替える前提）。
     """
     if df is None or df.empty or df.shape[1] < 2:
         return df
-    out = df.copy()
-    for r in range(len(out)):
-        c1 = _split_tokens(out.iat[r, 0])
-        c2 = _split_tokens(out.iat[r, 1])
-        if len(c1) >= 3 and len(c2) == 1:
-            out.iat[r, 0] = "".join(c1)
-    return out
+    # こちらも .iat を避けて列単位で処理する
+    col1 = df.iloc[:, 0].tolist()
+    col2 = df.iloc[:, 1].tolist()
+    for r in range(len(col1)):
+        c1 = _split_tokens(col1[r])
+        if len(c1) >= 3 and len(_split_tokens(col2[r])) == 1:
+            col1[r] = "".join(c1)
+    df.iloc[:, 0] = col1
+    return df
 
 # ========= List[dict] 生成（各 dict に url 追加） =========
 def _strip_gokei_and_flag(s: str) -> tuple[str, bool]:
@@ -181,9 +275,11 @@ def _strip_gokei_and_flag(s: str) -> tuple[str, bool]:
 def _has_kokusai_tanni(*values: str) -> bool:
     return any(("国際単位" in (v or "")) for v in values)
 
+_RE_UNITS = re.compile(r"(?:\s*ｇ\s*|\s*国際単位\s*)")
+
 def _strip_units_for_ryou(s: str) -> str:
     s = s or ""
-    return re.sub(r"(?:\s*ｇ\s*|\s*国際単位\s*)", "", s).strip()
+    return _RE_UNITS.sub("", s).strip()
 
 def _contains_haigou_fuka(s: str) -> bool:
     s = s or ""
@@ -207,10 +303,10 @@ def df_to_records(df: pd.DataFrame, pdf_url: str) -> List[Dict]:
     use_4cols = ncols >= 4
 
     for r in range(len(df)):
-        c1 = _split_tokens(df.iat[r, 0])
-        c2 = _split_tokens(df.iat[r, 1]) if ncols >= 2 else []
-        c3 = _split_tokens(df.iat[r, 2]) if ncols >= 3 else []
-        c4 = _split_tokens(df.iat[r, 3]) if ncols >= 4 else []
+        c1 = list(_split_tokens(df.iat[r, 0]))
+        c2 = _split_tokens(df.iat[r, 1]) if ncols >= 2 else ()
+        c3 = _split_tokens(df.iat[r, 2]) if ncols >= 3 else ()
+        c4 = _split_tokens(df.iat[r, 3]) if ncols >= 4 else ()
 
         equal_len = (len(c1) == len(c2))
         cond = ""
@@ -228,12 +324,16 @@ def df_to_records(df: pd.DataFrame, pdf_url: str) -> List[Dict]:
                 tanni = "国際単位" if _has_kokusai_tanni(r1_raw) else "g"
                 if _contains_haigou_fuka(r1):
                     tanni = ""
+                bikou = "合計量として" if had_g else ""
+                # 書き込み対象にならない行は dict を作る前に捨てる
+                if not is_meaningful(seibunn, r1, tanni=tanni, bikou=bikou):
+                    continue
                 recs.append({
                     "seibunn": seibunn,
                     "条件": cond if not equal_len else "",
                     "ryou1": r1, "ryou2": "", "ryou3": "", "ryou4": "",
                     "tanni": tanni,
-                    "bikou": "合計量として" if had_g else "",
+                    "bikou": bikou,
                     "url": pdf_url,
                 })
             else:
@@ -257,16 +357,28 @@ def df_to_records(df: pd.DataFrame, pdf_url: str) -> List[Dict]:
                 tanni = "国際単位" if _has_kokusai_tanni(r1_raw, v2_raw, v3_raw, v4_raw) else "g"
                 if _contains_haigou_fuka(r1):
                     tanni = ""
+                bikou = "合計量として" if had_g else ""
+                if not is_meaningful(seibunn, r1, r2, r3, r4, tanni, bikou):
+                    continue
                 recs.append({
                     "seibunn": seibunn,
                     "条件": cond if not equal_len else "",
                     "ryou1": r1, "ryou2": r2, "ryou3": r3, "ryou4": r4,
                     "tanni": tanni,
-                    "bikou": "合計量として" if had_g else "",
+                    "bikou": bikou,
                     "url": pdf_url,
                 })
     return recs
 
+# ========= テーブル1枚分の整形（ワーカープロセス用） =========
+def _process_one_table(args: tuple) -> List[Dict]:
+    """(df, pdf_url) を受け取り、整形4段を適用して List[dict] を返す。"""
+    df, pdf_url = args
+    df = drop_unwanted_rows(df)
+    df = move_amount_token_from_col1_to_col2(df)
+    df = squash_left_when_many_tokens_and_right_one(df)  # ★ JSON前処理
+    return df_to_records(df, pdf_url=pdf_url)
+
 # ========= Google Sheets =========
 # GCP関連の処理は別モジュールに分離
 from gcp import SheetsClient
@@ -279,24 +391,54 @@ def main():
 
     print(f"[INFO] Downloading PDF ... {pdf_url}")
     pdf_bytes = download_pdf_bytes(pdf_url)
-    pages_arg = to_pages_arg(pdf_bytes, pages_opt)
-    print(f"[INFO] Lattice only. pages='{pages_arg}', exclude={sorted(EXCLUDE_PAGES) or '-'}")
-
-    # 1) PDF→表抽出
-    items = extract_tables_lattice_only(pdf_bytes, pages_arg)
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+
+    # 前回追記した PDF と同一内容なら二重追記になるためスキップ
+    ensure_dir(CACHE_DIR)
+    last_digest_path = os.path.join(CACHE_DIR, LAST_DIGEST_FILENAME)
+    if os.path.exists(last_digest_path):
+        with open(last_digest_path, encoding="utf-8") as f:
+            if f.read().strip() == digest:
+                print("[INFO] PDF は前回追記時から変更なし。処理をスキップします。")
+                return
+
+    # BytesIO で二重に抱え込まず一時ファイル経由でパスを渡す
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tf:
+        tf.write(pdf_bytes)
+        pdf_path = tf.name
+    # 1) PDF→表抽出（同一 PDF + ページ指定はキャッシュから復元して再パースを省く）
+    #    途中で例外になっても一時ファイルを残さないよう、ページ指定の解決も
+    #    try/finally の中で行う
+    try:
+        pages_arg = to_pages_arg(pdf_path, pages_opt)
+        print(f"[INFO] Ruled tables only. pages='{pages_arg}', exclude={sorted(EXCLUDE_PAGES) or '-'}")
+        cache_path = os.path.join(CACHE_DIR, f"tables_{digest}_{pages_arg}.pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                items = pickle.load(f)
+            print(f"[INFO] Loaded cached tables: {cache_path}")
+        else:
+            items = extract_tables_lattice_only(pdf_path, pages_arg)
+            if items:
+                # 旧バージョンの PDF のキャッシュは読み返さないので、
+                # ダイジェストの異なる pkl を掃除して無限に溜めない
+                for name in os.listdir(CACHE_DIR):
+                    if name.startswith("tables_") and name.endswith(".pkl") \
+                            and not name.startswith(f"tables_{digest}_"):
+                        os.unlink(os.path.join(CACHE_DIR, name))
+                with open(cache_path, "wb") as f:
+                    pickle.dump(items, f)
+    finally:
+        os.unlink(pdf_path)
     if not items:
-        print("[ERROR] 表が検出できませんでした。line_scale / --pages / EXCLUDE_PAGES を調整してください。", file=sys.stderr)
+        print("[ERROR] 表が検出できませんでした。TABLE_SETTINGS / --pages / EXCLUDE_PAGES を調整してください。", file=sys.stderr)
         sys.exit(1)
 
-    # 2) 各テーブルを整形しながら List[dict] へ（各 dict に url を付与）
-    all_records: List[Dict] = []
-    for it in items:
-        df = it["df"]
-        df = drop_unwanted_rows(df)
-        df = move_amount_token_from_col1_to_col2(df)
-        df = squash_left_when_many_tokens_and_right_one(df)  # ★ JSON前処理
-        recs = df_to_records(df, pdf_url=pdf_url)
-        all_records.extend(recs)
+    # 2) 各テーブルを並列に整形して List[dict] へ（各 dict に url を付与）
+    #    テーブル間に依存はなく CPU バウンドなのでプロセスプールで全コアを使う
+    with concurrent.futures.ProcessPoolExecutor() as ex:
+        results = list(ex.map(_process_one_table, [(it["df"], pdf_url) for it in items]))
+    all_records: List[Dict] = list(itertools.chain.from_iterable(results))
 
     print(f"[INFO] JSON records generated: {len(all_records)}")
 
@@ -313,6 +455,10 @@ def main():
     sheets_client = SheetsClient()
     sheets_client.append_records(SPREADSHEET_ID, APPEND_SHEET_TITLE, all_records, pdf_url)
 
+    # 追記が成功した PDF のダイジェストを記録（次回のスキップ判定に使用）
+    with open(last_digest_path, "w", encoding="utf-8") as f:
+        f.write(digest)
+
     print("[DONE] 完了。")
 
 if __name__ == "__main__":
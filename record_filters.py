@@ -0,0 +1,12 @@
+# 書き込み対象レコードの判定ルール（main.py / html_to_table.py 共通）
+
+
+def is_meaningful(seibunn: str, ryou1: str = "", ryou2: str = "", ryou3: str = "",
+                  ryou4: str = "", tanni: str = "", bikou: str = "") -> bool:
+    """
+    成分名があり、かつ 配合量1〜4 / 単位 / 備考 のいずれかが入っているか。
+    False のレコードはシートに書き込まない。
+    """
+    if not (seibunn or "").strip():
+        return False
+    return any((v or "").strip() for v in (ryou1, ryou2, ryou3, ryou4, tanni, bikou))